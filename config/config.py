@@ -10,6 +10,23 @@ class Config():
     
     gpt: dict[str, list[str]] = field(default_factory=dict)
     report: dict[str, list[str]] = field(default_factory=dict)    
+    stage: dict[str, any] = field(default_factory=lambda: {
+        "column": "延误量最大3环节",
+        "top_n": 3,
+        "tie": "first",
+        "mode": "fill",
+        "separator": "、"
+    })
+    shard: dict[str, any] = field(default_factory=lambda: {
+        "workers": 1,  # 1为单进程, 0为使用全部CPU核心
+        "min_rows": 200000
+    })
+    sniff: dict[str, any] = field(default_factory=lambda: {
+        "sample_bytes": 16 * 1024,
+        "max_header_rows": 5,
+        "cache_path": "./data/.schema_cache.json",
+        "columns": {}
+    })
     day_datapath: str = field(default='./data/day')
     week_datapath: str = field(default='./data/week')
     report_datapath: str = field(default='./data/report')
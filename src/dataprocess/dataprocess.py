@@ -7,6 +7,7 @@ from tqdm import tqdm
 from pathlib import Path
 
 from config.config import Config
+from src.dataprocess.sniff import FileSniffer
 
 class DataProcess():
     
@@ -126,11 +127,15 @@ class DataProcess():
             self.logger.error(f"传入的功能数字编号错误: {self.number}, 请核实代码")
             raise ValueError(f"传入的功能数字编号错误: {self.number}")
         
+        sniffer: FileSniffer = FileSniffer()
         if self.need == 0:
             path_list: list[Path] = self.path_read(path)
             path_list = [p for p in path_list if p.suffix == ".csv"]
+            sniffer.check(path_list)
         elif self.need == 1:
             excel_list: list[Path] = [p for p in self.path_read(path) if p.suffix == ".xlsx"]
+            # 转换前先校验, 避免格式错误的文件在长时间转换后才报错
+            sniffer.check(excel_list)
             path_list: list[Path] = [self.excel_to_csv(p) for p in excel_list]
         
         self.logger.info(f"一共读取到: {len(path_list)}个文件路径.")
@@ -0,0 +1,132 @@
+import pandas as pd
+import numpy as np
+import logging
+
+
+class KeyNormalizer():
+    """统一解析各表格的日期与城市线路键, 并编码为共享类别的分类列
+    """
+
+    logger: logging.Logger = logging.getLogger(f"ProvincialSummary.{__name__}")
+
+    # 已解析值的缓存, 所有实例共享, 同一字符串整个流程只解析一次
+    _date_memo: dict[any, any] = dict()
+    _route_memo: dict[any, any] = dict()
+
+    def memo_map(self, series: pd.Series, memo: dict[any, any], parse, fill: any) -> np.ndarray:
+        """对序列的唯一值做缓存解析, 再按位置映射回整列
+
+        Args:
+            series (pd.Series): 待解析的列
+            memo (dict[any, any]): 解析结果缓存
+            parse (Callable[[list], list]): 批量解析函数
+            fill (any): 缺失值对应的结果
+
+        Returns:
+            np.ndarray: 解析后的值
+        """
+
+        codes, uniques = pd.factorize(series)
+        missing: list = [u for u in uniques if u not in memo]
+        if missing:
+            memo.update(
+                (k, v) for k, v in zip(missing, parse(missing)) if not pd.isna(v)
+            )
+
+        # 末尾追加的 fill 对应 factorize 中缺失值的编码 -1
+        values: np.ndarray = np.empty(len(uniques) + 1, dtype=object)
+        values[:-1] = [memo.get(u, fill) for u in uniques]
+        values[-1] = fill
+
+        return values[codes]
+
+
+    def dates(self, series: pd.Series, errors: str = "raise") -> pd.Series:
+        """解析日期列, 每个不同的日期字符串只解析一次
+
+        Args:
+            series (pd.Series): 日期列
+            errors (str, optional): 解析失败的处理方式, 同 pd.to_datetime. Defaults to "raise".
+
+        Returns:
+            pd.Series: datetime.date 类型的日期列
+        """
+
+        def parse(values: list) -> list:
+            parsed = pd.to_datetime(pd.Series(values, dtype=object).astype(str), format="mixed", errors=errors)
+            return list(parsed.dt.date)
+
+        values = self.memo_map(series, self._date_memo, parse, pd.NaT)
+
+        return pd.Series(values, index=series.index, name=series.name)
+
+
+    def routes(self, series: pd.Series) -> pd.Series:
+        """规范化城市线路名称, 去除首尾空白
+
+        Args:
+            series (pd.Series): 城市线路名称列
+
+        Returns:
+            pd.Series: 规范化后的城市线路名称列
+        """
+
+        def parse(values: list) -> list:
+            return [v.strip() if isinstance(v, str) else v for v in values]
+
+        values = self.memo_map(series, self._route_memo, parse, np.nan)
+
+        return pd.Series(values, index=series.index, name=series.name)
+
+
+    def encode(self, keys: list[tuple[pd.DataFrame, str]], extra: list[any] | None = None) -> pd.CategoricalDtype:
+        """将多张表的同类键列编码为同一组类别, 使合并时直接比较整数编码
+
+        Args:
+            keys (list[tuple[pd.DataFrame, str]]): (表格, 列名) 列表
+            extra (list[any] | None, optional): 额外加入的类别(如后续用于填充的占位值). Defaults to None.
+
+        Returns:
+            pd.CategoricalDtype: 共享的分类类型
+        """
+
+        uniques = [np.asarray(df[col].dropna().unique(), dtype=object) for df, col in keys]
+        uniques.append(np.asarray(extra or [], dtype=object))
+        categories = pd.Index(np.concatenate(uniques)).unique().sort_values()
+        dtype = pd.CategoricalDtype(categories)
+
+        for df, col in keys:
+            df[col] = df[col].astype(dtype)
+
+        return dtype
+
+
+    def run(
+        self,
+        date_keys: list[tuple[pd.DataFrame, str]],
+        route_keys: list[tuple[pd.DataFrame, str]],
+        errors: str = "raise",
+        extra_routes: list[str] | None = None
+    ) -> None:
+        """该类的主运行方法: 解析并编码所有表格的日期与城市线路键
+
+        Args:
+            date_keys (list[tuple[pd.DataFrame, str]]): 日期键 (表格, 列名) 列表
+            route_keys (list[tuple[pd.DataFrame, str]]): 城市线路键 (表格, 列名) 列表
+            errors (str, optional): 日期解析失败的处理方式. Defaults to "raise".
+            extra_routes (list[str] | None, optional): 额外加入线路类别的值. Defaults to None.
+        """
+
+        for df, col in date_keys:
+            df[col] = self.dates(df[col], errors)
+        for df, col in route_keys:
+            df[col] = self.routes(df[col])
+
+        date_dtype = self.encode(date_keys)
+        route_dtype = self.encode(route_keys, extra_routes)
+
+        self.logger.info(
+            f"键规范化完成: 日期 {len(date_dtype.categories)}个 | 线路 {len(route_dtype.categories)}个"
+        )
+
+        return None
@@ -0,0 +1,357 @@
+import pandas as pd
+import logging
+import openpyxl
+import chardet
+import codecs
+import csv
+import io
+import json
+import hashlib
+
+from pathlib import Path
+from dataclasses import dataclass, field, asdict
+
+from config.config import Config
+
+
+@dataclass
+class FileSchema():
+    """单个数据文件的读取方案
+    """
+
+    kind: str
+    encoding: str | None = field(default=None)
+    header_row: int = field(default=0)
+    columns: dict[str, str] = field(default_factory=dict)
+
+
+class FileSniffer():
+    """采样文件开头若干字节, 识别编码、表头行与列映射, 并按文件指纹缓存结果
+    """
+
+    logger: logging.Logger = logging.getLogger(f"ProvincialSummary.{__name__}")
+    config: Config = Config.from_json()
+
+    # 缓存结构: {文件绝对路径: {"fingerprint": 指纹, "columns_hash": 必需列哈希, "schema": FileSchema}}
+    _cache: dict[str, dict[str, any]] | None = None
+
+    def __init__(self):
+        """初始化 FileSniffer 类实例
+        """
+
+        self.sniff: dict[str, any] = self.config.sniff
+        self.sample_bytes: int = self.sniff["sample_bytes"]
+        self.max_header_rows: int = self.sniff["max_header_rows"]
+        self.cache_path: Path = Path(self.sniff["cache_path"])
+
+
+    def required_columns(self, kind: str) -> list[str]:
+        """获取某类文件必须包含的列
+
+        Args:
+            kind (str): 文件类别
+
+        Returns:
+            list[str]: 必需列名列表
+        """
+
+        if kind == "延误量":
+            return self.config.gpt['各环节延误量'] + self.config.gpt['计算列']
+        if kind == "城市线路":
+            return self.config.gpt['城市线路']
+        if kind == "省区":
+            # 列顺序中除 MainProcess 自行生成的核实/复盘/全量列外, 其余均来自省区表
+            derived: list[str] = ["（核实）", "（复盘）", "（全量）", "差值变化"]
+            return [col for col in self.config.report['列顺序'] if not any(d in col for d in derived)]
+
+        return self.sniff["columns"][kind]
+
+
+    def columns_hash(self, kind: str) -> str:
+        """计算文件类别及其必需列的哈希, 配置变化后缓存随之失效
+
+        Args:
+            kind (str): 文件类别
+
+        Returns:
+            str: 哈希值
+        """
+
+        text: str = json.dumps([kind, self.required_columns(kind)], ensure_ascii=False)
+
+        return hashlib.md5(text.encode("utf-8")).hexdigest()
+
+
+    def kind_of(self, path: Path) -> str | None:
+        """根据文件名判断文件类别
+
+        Args:
+            path (Path): 文件路径
+
+        Returns:
+            str | None: 文件类别, 无法识别时返回None
+        """
+
+        for kind in ["延误量", "城市线路", "省区", "全量线路"]:
+            if kind in path.name:
+                return kind
+
+        return None
+
+
+    @staticmethod
+    def fingerprint(path: Path) -> str:
+        """计算文件指纹(文件大小 + 修改时间)
+
+        Args:
+            path (Path): 文件路径
+
+        Returns:
+            str: 文件指纹
+        """
+
+        stat = path.stat()
+
+        return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+
+    @staticmethod
+    def normalize(name: any) -> str:
+        """统一列名写法, 去除BOM与空白并将全角括号转为半角
+
+        Args:
+            name (any): 原始列名
+
+        Returns:
+            str: 规范化后的列名
+        """
+
+        name = str(name).replace("\ufeff", "").replace("（", "(").replace("）", ")")
+
+        return "".join(name.split())
+
+
+    def detect_encoding(self, sample: bytes) -> str:
+        """识别采样字节的编码
+
+        Args:
+            sample (bytes): 文件开头的采样字节
+
+        Returns:
+            str: 编码名称
+
+        Raises:
+            ValueError: 无法识别编码
+        """
+
+        try:
+            # 增量解码器允许采样末尾截断半个字符
+            codecs.getincrementaldecoder("utf-8-sig")().decode(sample, final=False)
+            return "utf-8-sig"
+        except UnicodeDecodeError:
+            pass
+
+        encoding = chardet.detect(sample)["encoding"]
+        if encoding is None:
+            raise ValueError("无法识别文件编码")
+
+        encoding = encoding.lower()
+        # GB2312/GBK 均为 GB18030 的子集, 统一按超集读取
+        if encoding in ["gb2312", "gbk", "gb18030"]:
+            return "gb18030"
+
+        return encoding
+
+
+    def sample_rows(self, path: Path) -> tuple[str | None, list[list[any]]]:
+        """读取文件开头的若干行
+
+        Args:
+            path (Path): 文件路径
+
+        Returns:
+            tuple[str | None, list[list[any]]]: 编码(excel文件为None)与采样行
+        """
+
+        if path.suffix == ".xlsx":
+            wb: openpyxl.Workbook = openpyxl.load_workbook(path, read_only=True)
+            rows = [list(row) for row in wb.active.iter_rows(max_row=self.max_header_rows, values_only=True)]
+            wb.close()
+            return None, rows
+
+        with open(path, "rb") as f:
+            sample: bytes = f.read(self.sample_bytes)
+            truncated: bool = bool(f.read(1))
+
+        encoding: str = self.detect_encoding(sample)
+        text: str = codecs.getincrementaldecoder(encoding)(errors="replace").decode(sample, final=not truncated)
+        if truncated:
+            # 丢弃被截断的最后一行
+            text = text[:text.rfind("\n") + 1]
+
+        rows = list(csv.reader(io.StringIO(text)))[:self.max_header_rows]
+
+        return encoding, rows
+
+
+    def locate_header(self, rows: list[list[any]], required: list[str]) -> tuple[int, dict[str, str]]:
+        """在采样行中定位表头, 并建立配置列名到文件列名的映射
+
+        Args:
+            rows (list[list[any]]): 采样行
+            required (list[str]): 必需列名列表
+
+        Returns:
+            tuple[int, dict[str, str]]: 表头所在行号与列映射
+
+        Raises:
+            ValueError: 采样行中没有包含全部必需列的表头
+        """
+
+        missing: set[str] = set(required)
+        for i, row in enumerate(rows):
+            header: dict[str, str] = {self.normalize(c): str(c) for c in row if c is not None}
+            columns = {col: header[self.normalize(col)] for col in required if self.normalize(col) in header}
+            if len(columns) == len(required):
+                return i, columns
+            missing = min(missing, set(required) - set(columns), key=len)
+
+        raise ValueError(f"前{len(rows)}行中未找到表头, 缺失列: {missing}")
+
+
+    def load_cache(self) -> dict[str, dict[str, any]]:
+        """加载持久化的读取方案缓存
+
+        Returns:
+            dict[str, dict[str, any]]: 读取方案缓存
+        """
+
+        if FileSniffer._cache is not None:
+            return FileSniffer._cache
+
+        FileSniffer._cache = dict()
+        if self.cache_path.exists():
+            try:
+                with open(self.cache_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                for key, value in data.items():
+                    FileSniffer._cache[key] = {
+                        "fingerprint": value["fingerprint"],
+                        "columns_hash": value.get("columns_hash"),
+                        "schema": FileSchema(**value["schema"])
+                    }
+            except (json.JSONDecodeError, KeyError, TypeError):
+                self.logger.warning(f"读取方案缓存已损坏, 将重新识别: {self.cache_path}")
+                FileSniffer._cache = dict()
+
+        return FileSniffer._cache
+
+
+    def save_cache(self) -> None:
+        """将读取方案缓存写入磁盘
+        """
+
+        data = {
+            key: {
+                "fingerprint": value["fingerprint"],
+                "columns_hash": value["columns_hash"],
+                "schema": asdict(value["schema"])
+            }
+            for key, value in self.load_cache().items()
+        }
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.cache_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
+
+        return None
+
+
+    def sniff_file(self, path: Path) -> FileSchema | None:
+        """识别单个文件的读取方案, 命中缓存时直接返回
+
+        Args:
+            path (Path): 文件路径
+
+        Returns:
+            FileSchema | None: 读取方案, 无法识别文件类别时返回None
+
+        Raises:
+            ValueError: 文件编码或表头不符合要求
+        """
+
+        kind: str | None = self.kind_of(path)
+        if kind is None:
+            return None
+
+        cache = self.load_cache()
+        key: str = str(path.resolve())
+        fingerprint: str = self.fingerprint(path)
+        columns_hash: str = self.columns_hash(kind)
+        if (key in cache and cache[key]["fingerprint"] == fingerprint
+                and cache[key]["columns_hash"] == columns_hash):
+            return cache[key]["schema"]
+
+        try:
+            encoding, rows = self.sample_rows(path)
+            header_row, columns = self.locate_header(rows, self.required_columns(kind))
+        except (ValueError, LookupError) as e:
+            self.logger.error(f"{path.name} 不符合{kind}表格式: {e}")
+            raise ValueError(f"{path.name} 不符合{kind}表格式: {e}")
+
+        schema = FileSchema(kind, encoding, header_row, columns)
+        cache[key] = {"fingerprint": fingerprint, "columns_hash": columns_hash, "schema": schema}
+        self.save_cache()
+        self.logger.info(f"{path.name} 识别完成: 编码 {encoding} | 表头行 {header_row}")
+
+        return schema
+
+
+    def check(self, path_list: list[Path]) -> None:
+        """批量识别文件, 在耗时处理开始前拒绝所有格式错误的文件
+
+        Args:
+            path_list (list[Path]): 文件路径列表
+
+        Raises:
+            ValueError: 存在格式错误的文件
+        """
+
+        errors: list[str] = list()
+        for p in path_list:
+            try:
+                if self.sniff_file(p) is None:
+                    self.logger.info(f"{p.name} 无法识别文件类别, 已跳过格式校验.")
+            except ValueError as e:
+                errors.append(str(e))
+
+        if errors:
+            raise ValueError("以下文件格式错误:\n" + "\n".join(errors))
+
+        return None
+
+
+    def read_csv(self, path: Path, required_only: bool = False) -> pd.DataFrame:
+        """按识别出的读取方案读取csv文件, 并将列名统一为配置中的列名
+
+        Args:
+            path (Path): csv文件路径
+            required_only (bool, optional): 是否只读取必需列. Defaults to False.
+
+        Returns:
+            pd.DataFrame: 读取的表格数据
+
+        Raises:
+            ValueError: 无法识别文件类别
+        """
+
+        schema: FileSchema | None = self.sniff_file(path)
+        if schema is None:
+            raise ValueError(f"{path.name} 无法识别文件类别")
+
+        usecols = list(schema.columns.values()) if required_only else None
+        df: pd.DataFrame = pd.read_csv(
+            path, encoding=schema.encoding, skiprows=schema.header_row, usecols=usecols
+        )
+        rename: dict[str, str] = {v: k for k, v in schema.columns.items() if k != v}
+
+        return df.rename(columns=rename)
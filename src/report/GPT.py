@@ -1,10 +1,13 @@
 import pandas as pd
 import logging
-import chardet
 
 from pathlib import Path
 
 from config.config import Config
+from src.dataprocess.sniff import FileSniffer
+from src.dataprocess.normalize import KeyNormalizer
+from src.report.stage import DelayStage, StageResult
+from src.report.shard import ShardExecutor
 
 
 class GPT():
@@ -43,14 +46,15 @@ class GPT():
         if self.number == 2:
             path = [p for p in self.path if len(p.name) >= 15]
 
+        sniffer: FileSniffer = FileSniffer()
         for p in path:
             print(p.name)
             if "延误量" in p.name:
-                df_delay: pd.DataFrame = pd.read_csv(p, encoding='utf-8-sig')
+                df_delay: pd.DataFrame = sniffer.read_csv(p, required_only=True)
                 delay_list.append(df_delay)
                 
             if "城市线路" in p.name:
-                df_city: pd.DataFrame = pd.read_csv(p, encoding='utf-8-sig')
+                df_city: pd.DataFrame = sniffer.read_csv(p, required_only=True)
                 city_list.append(df_city)
         
         delay_quantity: pd.DataFrame = pd.concat(delay_list, axis=0)
@@ -86,30 +90,59 @@ class GPT():
             left_on=['日期', '城市线路名称'], right_on=['日期', '城市线路名称']
         ).rename(columns={"城市线路名称": "城市线路"})
         
-        df_cal = df.loc[:, self.gpt['计算列']]
-        df_cal["sum"] = df_cal.sum(axis=1)
-        
-        cal_cols: list[str] = list()
-        for col in self.gpt["计算列"]:
-            new_col = col[:-3] + "占比"
-            df_cal[new_col] = df_cal[col] / df_cal['sum']
-            df_cal[new_col] = df_cal[new_col].apply(lambda x: f"{x: .2%}")
-            cal_cols.append(col)
-            cal_cols.append(new_col)
-        
-        df_cal = df_cal.loc[:, cal_cols]
-        calc_cols = set(self.gpt['计算列'])  # 转为集合，O(1)查找
+        return self.report_format(df)
+
+
+    def shard_production(self, df_list: list[pd.DataFrame], executor: ShardExecutor) -> pd.DataFrame:
+        """多进程分片制作GPT报表, 合并与占比计算在工作进程中完成
+
+        Args:
+            df_list (list[pd.DataFrame]): 表格数据
+            executor (ShardExecutor): 分片执行器
+
+        Returns:
+            pd.DataFrame: GPT报表
+        """
+
+        delay_quantity, city_route = df_list
+        city_pos, delay_pos, stage_result = executor.run(delay_quantity, city_route)
+
+        keys: list[str] = ['日期', '城市线路名称']
+        delay_cols: list[str] = [col for col in delay_quantity.columns if col not in keys]
+        df_city = city_route.iloc[city_pos].reset_index(drop=True)
+        # 行号 -1 在 reindex 中不存在, 对应未匹配的空行, 与左连接结果一致
+        df_delay = delay_quantity.loc[:, delay_cols].reset_index(drop=True).reindex(delay_pos).reset_index(drop=True)
+        df = pd.concat([df_city, df_delay], axis=1).rename(columns={"城市线路名称": "城市线路"})
+
+        return self.report_format(df, stage_result)
+
+
+    def report_format(self, df: pd.DataFrame, stage_result: StageResult | None = None) -> pd.DataFrame:
+        """计算占比并整理GPT报表的列顺序与格式
+
+        Args:
+            df (pd.DataFrame): 城市线路与延误量合并后的表格
+            stage_result (StageResult | None, optional): 已算好的占比结果. Defaults to None.
+
+        Returns:
+            pd.DataFrame: GPT报表
+        """
+
+        # 六个环节的占比与前N环节在 DelayStage 中按矩阵一次算出
+        stage: DelayStage = DelayStage()
+        df_cal = stage.run(df, stage_result)
+        calc_cols = set(self.gpt['计算列'] + [stage.target])  # 转为集合，O(1)查找
         column_need = [col for col in df.columns if col not in calc_cols]
         df_name = df.loc[:, column_need]
         result = pd.concat([df_name, df_cal], axis=1)
         
         result = result.rename(columns={"标准": "标准时效"})
         cols = result.columns.tolist()
-        cols.insert(4, cols.pop(cols.index("延误量最大3环节")))
+        cols.insert(4, cols.pop(cols.index(stage.target)))
         result = result.loc[:, cols]
         
-        result['达成率(%)'] = result['达成率(%)'].apply(lambda x: f"{x: .2f}%")
-        result['与第一差值(%)'] = result['与第一差值(%)'].apply(lambda x: f"{x: .2f}%")
+        result['达成率(%)'] = stage.format_percent(result['达成率(%)'].to_numpy(), 1)
+        result['与第一差值(%)'] = stage.format_percent(result['与第一差值(%)'].to_numpy(), 1)
     
         self.logger.info("GPT报表制作完成.")
         
@@ -127,10 +160,24 @@ class GPT():
         
         df_list = self.data_read()
         delay_quantity, city_route = df_list
-        delay_quantity['日期'] = pd.to_datetime(delay_quantity['日期'], format='mixed').dt.date
-        city_route['日期'] = pd.to_datetime(city_route['日期'], format="mixed").dt.date
+        KeyNormalizer().run(
+            date_keys=[(delay_quantity, '日期'), (city_route, '日期')],
+            route_keys=[(delay_quantity, '城市线路名称'), (city_route, '城市线路名称')]
+        )
 
-        if self.number == 1:
+        executor: ShardExecutor = ShardExecutor()
+        if executor.enabled(len(city_route)):
+            if self.number == 2:
+                # 与逐日合并一致, 只保留两张表共有的日期
+                date_set = set(delay_quantity['日期'].unique()).intersection(set(city_route['日期'].unique()))
+                delay_quantity = delay_quantity.loc[delay_quantity['日期'].isin(date_set), :]
+                city_route = city_route.loc[city_route['日期'].isin(date_set), :]
+
+            gpt = self.shard_production([delay_quantity, city_route], executor)
+            if self.number == 2:
+                gpt.sort_values(by=['日期', "城市线路"], inplace=True)
+
+        elif self.number == 1:
             gpt = self.report_production([delay_quantity, city_route])
 
         elif self.number == 2:
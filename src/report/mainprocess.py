@@ -5,6 +5,8 @@ from pathlib import Path
 from tqdm import tqdm
 
 from config.config import Config
+from src.dataprocess.sniff import FileSniffer
+from src.dataprocess.normalize import KeyNormalizer
 from src.report.GPT import GPT
 
 
@@ -64,19 +66,20 @@ class MainProcess():
     def report_production(self, single_gpt: pd.DataFrame, multi_gpt: pd.DataFrame) -> pd.DataFrame:
         """制作省区汇总报表"""
         # ------------------------------------------------------------------
-        # 1. 读取省区文件（与您原逻辑完全一致）
+        # 1. 读取省区文件（编码与表头行由 FileSniffer 识别）
         # ------------------------------------------------------------------
+        sniffer: FileSniffer = FileSniffer()
         for p in self.path_list:
             if "省区" in p.name:
-                provincial: pd.DataFrame = pd.read_csv(p, skiprows=[0], encoding='utf-8-sig')
+                provincial: pd.DataFrame = sniffer.read_csv(p)
             
             if "全量线路" in p.name:
-                total_route: pd.DataFrame = pd.read_csv(p)
+                total_route: pd.DataFrame = sniffer.read_csv(p)
         # 仅此处改成 .ffill() 去掉 FutureWarning
         provincial = provincial.copy().ffill()
 
         # ------------------------------------------------------------------
-        # 2. 重命名 + 日期转换（与您原逻辑完全一致）
+        # 2. 重命名 + 键规范化（日期/线路统一编码后供下方所有合并使用）
         # ------------------------------------------------------------------
         name_dict = {
             "日期": "GPT展示日期",
@@ -85,9 +88,34 @@ class MainProcess():
             "线路未达成量": "未达成量（核实）"
         }
         multi_gpt = multi_gpt.rename(columns=name_dict)
-        # provincial["GPT展示日期"] = pd.to_datetime(provincial["GPT展示日期"], format="mixed").dt.date
-        provincial["GPT展示日期"] = pd.to_datetime(provincial["GPT展示日期"], errors='coerce').dt.date
-        # multi_gpt["GPT展示日期"] = pd.to_datetime(multi_gpt["GPT展示日期"], format="mixed").dt.date
+
+        single_dict = {
+            "日期": "GPT展示日期",
+            "城市线路": "结果（复盘）",
+            "与第一差值(%)": "与第一差值（复盘）",
+            "线路未达成量": "未达成量（复盘）"
+        }
+        single_gpt = single_gpt.rename(columns=single_dict)
+
+        total_need = ["线路名称", "与第一差值(%)"]
+        total_dict = {
+            "线路名称": "城市线路名称",
+            "与第一差值(%)": "与第一差值（全量）"
+        }
+        total_route = total_route.copy().loc[:, total_need]
+        total_route = total_route.rename(columns=total_dict)
+
+        KeyNormalizer().run(
+            date_keys=[
+                (provincial, "GPT展示日期"), (multi_gpt, "GPT展示日期"), (single_gpt, "GPT展示日期")
+            ],
+            route_keys=[
+                (provincial, "城市线路名称"), (multi_gpt, "城市线路名称"),
+                (single_gpt, "结果（复盘）"), (total_route, "城市线路名称")
+            ],
+            errors="coerce",
+            extra_routes=["消除"]  # 复盘未匹配时的占位值, 预先纳入共享类别
+        )
 
         # ------------------------------------------------------------------
         # 3. 第一次合并： provincial × multi_gpt（列选取逻辑不变）
@@ -118,7 +146,7 @@ class MainProcess():
             temp = (df1.loc[mask, keys]
                     .merge(multi_gpt[keys + [qty_col_src, pct_col_src]],
                         on=keys, how='left')
-                    .groupby(keys)                    # 若出现多行，先聚合
+                    .groupby(keys, observed=True)     # 若出现多行，先聚合
                     .first()                           # 取第一行（或.mean()）
                     .reindex(df1.loc[mask, keys])      # 再对齐到 mask 的键顺序
                 )
@@ -129,19 +157,10 @@ class MainProcess():
         # ------------------------------------------------------------------
         # 4. 第二次合并： df1 × single_gpt（列选取逻辑不变）
         # ------------------------------------------------------------------
-        single_dict = {
-            "日期": "GPT展示日期",
-            "城市线路": "结果（复盘）",
-            "与第一差值(%)": "与第一差值（复盘）",
-            "线路未达成量": "未达成量（复盘）"
-        }
-        single_gpt = single_gpt.rename(columns=single_dict)
-        single_gpt["GPT展示日期"] = pd.to_datetime(single_gpt["GPT展示日期"], format="mixed").dt.date
-
         single_need = ["结果（复盘）", "与第一差值（复盘）", "未达成量（复盘）"]
         single_gpt1 = single_gpt.loc[:, single_need]
         df2 = pd.merge(df1, single_gpt1, how="left", left_on='城市线路名称', right_on="结果（复盘）")
-        df2['结果（复盘）'].fillna("消除", inplace=True)
+        df2['结果（复盘）'] = df2['结果（复盘）'].fillna("消除")
 
         # 新增空列（与原逻辑一致）
         df2["延误量（复盘）"] = None
@@ -162,7 +181,7 @@ class MainProcess():
                     how="left",
                     on="结果（复盘）"
                 )
-                .groupby(keys)                            # 3. 若出现多对多，先聚合到唯一键
+                .groupby(keys, observed=True)             # 3. 若出现多对多，先聚合到唯一键
                 .first()                                  #   取第一行（或 .mean() / .sum()）
                 .reindex(df2.loc[mask, keys])             # 4. 对齐到 mask 的键顺序
             )
@@ -175,15 +194,6 @@ class MainProcess():
         # 5. 列顺序校验 & 返回（与原逻辑完全一致）
         # ------------------------------------------------------------------
         
-        total_need = ["线路名称", "与第一差值(%)"]
-        total_dict = {
-            "线路名称": "城市线路名称",
-            "与第一差值(%)": "与第一差值（全量）"
-        }
-        
-        total_route = total_route.copy().loc[:, total_need]
-        total_route = total_route.rename(columns=total_dict)
-        
         result = pd.merge(df2, total_route, on="城市线路名称", how="left")
         diffdata = result['与第一差值（核实）'].copy().astype(str).apply(
             lambda x: float(x[:-1])/100 if any(char.isdigit() for char in x) else 0
@@ -0,0 +1,180 @@
+import pandas as pd
+import numpy as np
+import logging
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+from config.config import Config
+from src.report.stage import DelayStage, StageResult
+
+
+class ShardExecutor():
+    """按城市线路名称的哈希值将GPT计算分片到多个进程
+
+    各列以整数编码/数值数组的形式写入共享内存, 工作进程直接映射读取, 不序列化DataFrame.
+    """
+
+    config: Config = Config.from_json()
+    logger: logging.Logger = logging.getLogger(f"ProvincialSummary.{__name__}")
+
+    def __init__(self):
+        """初始化 ShardExecutor 类实例
+        """
+
+        workers: int = self.config.shard['workers']
+        self.workers: int = workers if workers > 0 else (os.cpu_count() or 1)
+        self.min_rows: int = self.config.shard['min_rows']
+
+
+    def enabled(self, rows: int) -> bool:
+        """判断是否启用分片计算
+
+        Args:
+            rows (int): 城市线路表格行数
+
+        Returns:
+            bool: 是否启用
+        """
+
+        return self.workers > 1 and rows >= self.min_rows
+
+
+    def shard_of(self, routes: pd.Series) -> np.ndarray:
+        """计算每行所属的分片编号
+
+        Args:
+            routes (pd.Series): 已编码为分类类型的城市线路名称列
+
+        Returns:
+            np.ndarray: 分片编号, 与行一一对应
+        """
+
+        categories = np.asarray(routes.cat.categories, dtype=object)
+        # 对线路名称本身取哈希, 保证同一线路在两张表中落入同一分片
+        route_shard = np.append(pd.util.hash_array(categories) % self.workers, 0).astype(np.int16)
+
+        return route_shard[routes.cat.codes.to_numpy()]
+
+
+    @staticmethod
+    def share(arrays: dict[str, np.ndarray], blocks: list[SharedMemory]) -> dict[str, tuple]:
+        """将数组写入共享内存
+
+        Args:
+            arrays (dict[str, np.ndarray]): 数组名称与数组
+            blocks (list[SharedMemory]): 已创建的共享内存块, 用于结束后释放
+
+        Returns:
+            dict[str, tuple]: 数组名称与 (共享内存名称, 形状, 类型)
+        """
+
+        specs: dict[str, tuple] = dict()
+        for key, array in arrays.items():
+            shm = SharedMemory(create=True, size=max(array.nbytes, 1))
+            blocks.append(shm)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+            specs[key] = (shm.name, array.shape, array.dtype.str)
+
+        return specs
+
+
+    @staticmethod
+    def work(shard: int, specs: dict[str, tuple]) -> tuple[np.ndarray, np.ndarray, StageResult]:
+        """工作进程: 对单个分片做合并与占比计算
+
+        Args:
+            shard (int): 分片编号
+            specs (dict[str, tuple]): 共享内存中的数组描述
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, StageResult]: 城市线路行号、延误量行号(-1为未匹配)与计算结果
+        """
+
+        blocks: list[SharedMemory] = [SharedMemory(name=name) for name, _, _ in specs.values()]
+        try:
+            arrays = {
+                key: np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+                for (key, (_, shape, dtype)), shm in zip(specs.items(), blocks)
+            }
+
+            city_rows = np.nonzero(arrays['city_shard'] == shard)[0]
+            delay_rows = np.nonzero(arrays['delay_shard'] == shard)[0]
+
+            left = pd.DataFrame({
+                'date': arrays['city_date'][city_rows],
+                'route': arrays['city_route'][city_rows],
+                'city_pos': city_rows
+            })
+            right = pd.DataFrame({
+                'date': arrays['delay_date'][delay_rows],
+                'route': arrays['delay_route'][delay_rows],
+                'delay_pos': delay_rows
+            })
+            merged = left.merge(right, how='left', on=['date', 'route'])
+
+            city_pos = merged['city_pos'].to_numpy(dtype=np.int64)
+            delay_pos = merged['delay_pos'].fillna(-1).to_numpy(dtype=np.int64)
+
+            values = np.full((len(delay_pos), arrays['values'].shape[1]), np.nan)
+            matched = delay_pos >= 0
+            values[matched] = arrays['values'][delay_pos[matched]]
+            del arrays
+        finally:
+            for shm in blocks:
+                shm.close()
+
+        return city_pos, delay_pos, DelayStage().compute(values)
+
+
+    def run(self, delay_quantity: pd.DataFrame, city_route: pd.DataFrame) -> tuple[np.ndarray, np.ndarray, StageResult]:
+        """该类的主运行方法: 分片并行完成 城市线路 × 延误量 的左连接与占比计算
+
+        两张表的 日期/城市线路名称 必须已由 KeyNormalizer 编码为同一分类类型.
+
+        Args:
+            delay_quantity (pd.DataFrame): 延误量表格
+            city_route (pd.DataFrame): 城市线路表格
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, StageResult]: 城市线路行号、延误量行号(-1为未匹配)与计算结果,
+            行顺序与 pd.merge(city_route, delay_quantity, how='left') 一致
+        """
+
+        self.logger.info(f"GPT分片计算-开始: {self.workers}个进程")
+
+        arrays: dict[str, np.ndarray] = {
+            'city_date': city_route['日期'].cat.codes.to_numpy(),
+            'city_route': city_route['城市线路名称'].cat.codes.to_numpy(),
+            'city_shard': self.shard_of(city_route['城市线路名称']),
+            'delay_date': delay_quantity['日期'].cat.codes.to_numpy(),
+            'delay_route': delay_quantity['城市线路名称'].cat.codes.to_numpy(),
+            'delay_shard': self.shard_of(delay_quantity['城市线路名称']),
+            'values': delay_quantity.loc[:, DelayStage().columns].to_numpy(dtype=float)
+        }
+
+        blocks: list[SharedMemory] = list()
+        try:
+            specs = self.share(arrays, blocks)
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                parts = list(executor.map(self.work, range(self.workers), [specs] * self.workers))
+        finally:
+            for shm in blocks:
+                shm.close()
+                shm.unlink()
+
+        city_pos = np.concatenate([p[0] for p in parts])
+        delay_pos = np.concatenate([p[1] for p in parts])
+        # 按原表行号恢复 pd.merge 左连接的行顺序
+        order = np.lexsort((delay_pos, city_pos))
+
+        result = StageResult(
+            sums=np.concatenate([p[2].sums for p in parts])[order],
+            shares=np.concatenate([p[2].shares for p in parts])[order],
+            top=np.concatenate([p[2].top for p in parts])[order]
+        )
+
+        self.logger.info(f"GPT分片计算-结束: {len(order)}行")
+
+        return city_pos[order], delay_pos[order], result
@@ -0,0 +1,235 @@
+import pandas as pd
+import numpy as np
+import logging
+
+from dataclasses import dataclass
+
+from config.config import Config
+
+
+@dataclass
+class StageResult():
+    """各环节延误量矩阵的计算结果
+    """
+
+    sums: np.ndarray
+    shares: np.ndarray
+    top: np.ndarray
+
+
+class DelayStage():
+    """将六个环节延误量作为一个矩阵, 一次性计算占比、合计与延误量最大的前N个环节
+    """
+
+    config: Config = Config.from_json()
+    logger: logging.Logger = logging.getLogger(f"ProvincialSummary.{__name__}")
+
+    def __init__(self):
+        """初始化 DelayStage 类实例
+        """
+
+        self.columns: list[str] = self.config.gpt['计算列']
+        self.labels: list[str] = [col[:-3] for col in self.columns]
+        self.top_n: int = self.config.stage['top_n']
+        self.tie: str = self.config.stage['tie']
+        self.mode: str = self.config.stage['mode']
+        self.separator: str = self.config.stage['separator']
+        self.target: str = self.config.stage['column']
+
+        if isinstance(self.top_n, bool) or not isinstance(self.top_n, int) or self.top_n < 1:
+            self.logger.error(f"配置的环节数量错误: {self.top_n}, 须为不小于1的整数")
+            raise ValueError(f"配置的环节数量错误: {self.top_n}")
+
+        if self.tie not in ['first', 'last']:
+            self.logger.error(f"配置的并列处理方式错误: {self.tie}, 可选 first/last")
+            raise ValueError(f"配置的并列处理方式错误: {self.tie}")
+
+        if self.mode not in ['fill', 'check', 'overwrite']:
+            self.logger.error(f"配置的环节列处理方式错误: {self.mode}, 可选 fill/check/overwrite")
+            raise ValueError(f"配置的环节列处理方式错误: {self.mode}")
+
+
+    def rank(self, values: np.ndarray) -> np.ndarray:
+        """计算每行延误量最大的前N个环节
+
+        延误量为0或缺失的环节不参与排名; 延误量并列时, tie 为 first 取列顺序靠前的环节,
+        为 last 取列顺序靠后的环节.
+
+        Args:
+            values (np.ndarray): 延误量矩阵, 形状为 (行数, 环节数)
+
+        Returns:
+            np.ndarray: 环节列下标矩阵, 形状为 (行数, N), 按延误量降序, 不足N个的位置为 -1
+        """
+
+        rows, k = values.shape
+        top_n: int = min(self.top_n, k)
+
+        v: np.ndarray = np.where(values > 0, values, -np.inf)
+        if self.tie == 'last':
+            v = v[:, ::-1]
+
+        if top_n < k:
+            # argpartition 只保证第N大的值就位, 并列的边界值按列顺序补足N个
+            part = np.argpartition(-v, top_n - 1, axis=1)[:, :top_n]
+            threshold = np.take_along_axis(v, part, axis=1).min(axis=1, keepdims=True)
+            above = v > threshold
+            tied = v == threshold
+            need = top_n - above.sum(axis=1, keepdims=True)
+            chosen = above | (tied & (np.cumsum(tied, axis=1) <= need))
+            selected = np.nonzero(chosen)[1].reshape(rows, top_n)
+        else:
+            selected = np.broadcast_to(np.arange(k), (rows, k))
+
+        # 只对选中的N列做稳定排序, 并列时保持列顺序
+        order = np.argsort(-np.take_along_axis(v, selected, axis=1), axis=1, kind='stable')
+        top = np.take_along_axis(selected, order, axis=1)
+
+        if self.tie == 'last':
+            top = k - 1 - top
+        top[~np.take_along_axis(values > 0, top, axis=1)] = -1
+
+        return top
+
+
+    def compute(self, values: np.ndarray) -> StageResult:
+        """一次性计算合计、占比与前N环节
+
+        Args:
+            values (np.ndarray): 延误量矩阵, 形状为 (行数, 环节数)
+
+        Returns:
+            StageResult: 计算结果
+        """
+
+        sums: np.ndarray = np.nansum(values, axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            shares: np.ndarray = values / sums[:, None]
+
+        return StageResult(sums, shares, self.rank(values))
+
+
+    def stage_names(self, top: np.ndarray) -> np.ndarray:
+        """将前N环节下标拼接为环节名称
+
+        Args:
+            top (np.ndarray): 环节列下标矩阵
+
+        Returns:
+            np.ndarray: 环节名称, 没有延误环节的行为 None
+        """
+
+        # 每行的前N环节组合编码为一个整数, 每种组合只拼接一次名称
+        base: int = len(self.labels) + 1
+        key: np.ndarray = ((top + 1) * base ** np.arange(top.shape[1])).sum(axis=1)
+        codes, uniques = pd.factorize(key)
+
+        text: list[str | None] = list()
+        for combo in uniques:
+            names = [self.labels[combo // base ** j % base - 1] for j in range(top.shape[1]) if combo // base ** j % base]
+            text.append(self.separator.join(names) or None)
+
+        return np.array(text + [None], dtype=object)[codes]
+
+
+    @staticmethod
+    def format_percent(values: np.ndarray, scale: float = 100) -> np.ndarray:
+        """向量化地将数值格式化为 f"{x * scale: .2f}%", 结果与逐个格式化完全一致
+
+        先取整到0.01, 每个不同的取整值只格式化一次; 恰好落在舍入边界附近的值及负零
+        单独逐个格式化, 避免浮点取整与 Python 格式化的差异.
+
+        Args:
+            values (np.ndarray): 数值数组
+            scale (float, optional): 格式化前的缩放倍数. Defaults to 100.
+
+        Returns:
+            np.ndarray: 百分比字符串数组, 形状与输入一致
+        """
+
+        w: np.ndarray = np.asarray(values, dtype=float).ravel() * scale
+        with np.errstate(invalid='ignore'):
+            hundred: np.ndarray = w * 100
+            cents: np.ndarray = np.rint(hundred)
+            edge = np.abs(np.abs(hundred - np.trunc(hundred)) - 0.5) <= 1e-9 * np.maximum(1, np.abs(hundred))
+            exact = ~edge & ~((cents == 0) & np.signbit(w))
+
+        # 非有限值(nan/inf)直接作为键, 格式化结果与原值一致; 加0.0将负零统一为正零
+        key: np.ndarray = np.where(np.isfinite(w), cents / 100 + 0.0, w)
+        codes, uniques = pd.factorize(key, use_na_sentinel=False)
+        text: np.ndarray = np.array([f"{x: .2f}%" for x in uniques], dtype=object)[codes]
+
+        rest: np.ndarray = np.nonzero(~exact)[0]
+        text[rest] = [f"{x: .2f}%" for x in w[rest]]
+
+        return text.reshape(np.shape(values))
+
+
+    def format_shares(self, shares: np.ndarray) -> np.ndarray:
+        """将占比矩阵格式化为百分比字符串, 与 f"{x: .2%}" 结果一致
+
+        Args:
+            shares (np.ndarray): 占比矩阵
+
+        Returns:
+            np.ndarray: 百分比字符串矩阵
+        """
+
+        return self.format_percent(shares, 100)
+
+
+    def resolve(self, upstream: pd.Series, computed: np.ndarray) -> pd.Series:
+        """按配置处理上游的延误量最大环节列
+
+        Args:
+            upstream (pd.Series): 上游提供的环节列
+            computed (np.ndarray): 计算得到的环节名称
+
+        Returns:
+            pd.Series: 处理后的环节列
+        """
+
+        computed: pd.Series = pd.Series(computed, index=upstream.index)
+
+        if self.mode == 'overwrite':
+            return computed
+
+        if self.mode == 'check':
+            given = upstream.astype(str).str.strip()
+            mismatch = (upstream.notna() & (given != computed.astype(str))).sum()
+            if mismatch:
+                self.logger.warning(f"{self.target} 与计算结果不一致的行数: {mismatch}")
+            return upstream
+
+        missing = upstream.isna() | (upstream.astype(str).str.strip() == "")
+        self.logger.info(f"{self.target} 缺失并由计算结果补齐的行数: {missing.sum()}")
+
+        return upstream.mask(missing, computed)
+
+
+    def run(self, df: pd.DataFrame, result: StageResult | None = None) -> pd.DataFrame:
+        """该类的主运行方法
+
+        Args:
+            df (pd.DataFrame): 包含各环节延误量的表格
+            result (StageResult | None, optional): 已算好的结果(如分片计算), 为None时现场计算. Defaults to None.
+
+        Returns:
+            pd.DataFrame: 各环节延误量及其占比(交替排列), 以及处理后的延误量最大环节列
+        """
+
+        if result is None:
+            values: np.ndarray = df.loc[:, self.columns].to_numpy(dtype=float)
+            result = self.compute(values)
+        shares: np.ndarray = self.format_shares(result.shares)
+
+        df_cal: dict[str, any] = dict()
+        for i, (col, label) in enumerate(zip(self.columns, self.labels)):
+            df_cal[col] = df[col]
+            df_cal[label + "占比"] = shares[:, i]
+        df_cal = pd.DataFrame(df_cal, index=df.index)
+
+        upstream = df[self.target] if self.target in df.columns else pd.Series(None, index=df.index, dtype=object)
+        df_cal[self.target] = self.resolve(upstream, self.stage_names(result.top))
+
+        return df_cal